@@ -1,5 +1,17 @@
 import sys
+import os
 import re
+import time
+import hashlib
+import argparse
+import cProfile
+import pstats
+import tracemalloc
+import inspect
+import contextlib
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
 import pandas as pd
 import mammoth
 import win32com.client as win32
@@ -12,6 +24,131 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QProgressBar, QMessageBox, QGroupBox, QMenuBar, QAction)
 from PyQt5.QtCore import QThread, pyqtSignal, Qt
 
+# ==========================================
+# Shared Loading Helpers
+# ==========================================
+TABLE_CSS = """
+<style>
+    table { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
+    th, td { border: 1px solid #999999; padding: 8px; text-align: left; }
+    th { background-color: #f2f2f2; }
+</style>
+"""
+
+def load_word_template(path):
+    """Convert a .docx template to HTML and collect its {{placeholders}}."""
+    with open(path, "rb") as docx_file:
+        raw_text = mammoth.extract_raw_text(docx_file).value
+        placeholders = list(set(re.findall(r'\{\{(.*?)\}\}', raw_text)))
+        
+        docx_file.seek(0)
+        result = mammoth.convert_to_html(docx_file)
+        
+    # INJECT CSS FOR TABLE STYLING
+    return TABLE_CSS + result.value, placeholders
+
+def load_excel_data(path):
+    return pd.read_excel(path)
+
+# ==========================================
+# Profiling Mode
+# ==========================================
+class JobProfiler:
+    """Collects CPU (cProfile) and allocation (tracemalloc) data per job phase.
+
+    Phases may be entered many times (e.g. once per row) and their numbers
+    accumulate. Phases must not be nested. Allocation sites are recorded by
+    diffing snapshots around the first call of each phase, since snapshotting
+    every row would dominate the run.
+    """
+    TOP_ALLOCATIONS = 25
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.profiles = {}
+        self.phases = {}
+        self.allocations = {}
+        
+        # Keep the profiling machinery itself out of the allocation reports
+        source, first_line = inspect.getsourcelines(JobProfiler)
+        self._own_file = JobProfiler.__init__.__code__.co_filename
+        self._own_lines = range(first_line, first_line + len(source))
+        self._ignored_files = {module.__file__ for module in (tracemalloc, cProfile, pstats, contextlib)}
+        self._started_tracing = False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(5)
+            self._started_tracing = True
+
+    @contextmanager
+    def phase(self, name):
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        stats = self.phases.setdefault(name, {"calls": 0, "seconds": 0.0, "peak_bytes": 0,
+                                                   "net_bytes": 0, "peak_traced_bytes": 0})
+        
+        snapshot_before = None
+        if name not in self.allocations:
+            snapshot_before = tracemalloc.take_snapshot()
+            
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+        mem_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stats["seconds"] += time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            stats["calls"] += 1
+            stats["net_bytes"] += current - mem_before
+            # peak_bytes is what the phase itself added on top of memory already in use
+            stats["peak_bytes"] = max(stats["peak_bytes"], peak - mem_before)
+            stats["peak_traced_bytes"] = max(stats["peak_traced_bytes"], peak)
+            
+            if snapshot_before is not None:
+                diff = tracemalloc.take_snapshot().compare_to(snapshot_before, 'lineno')
+                self.allocations[name] = [stat for stat in diff if stat.size_diff > 0 and not self._is_own(stat)][:self.TOP_ALLOCATIONS]
+
+    def _is_own(self, stat):
+        frame = stat.traceback[0]
+        return (frame.filename in self._ignored_files
+                or (frame.filename == self._own_file and frame.lineno in self._own_lines))
+
+    def write_bundle(self):
+        """Write job.pstats, allocations.txt and phases.json; return the bundle folder."""
+        bundle_dir = os.path.join(self.output_dir, datetime.now().strftime("profile_%Y%m%d_%H%M%S_%f"))
+        os.makedirs(bundle_dir)
+        
+        with open(os.path.join(bundle_dir, "allocations.txt"), 'w') as f:
+            f.write(f"Top {self.TOP_ALLOCATIONS} allocation sites per phase "
+                    f"(memory still held at the end of the phase's first call, compared to its start):\n")
+            for name, stats in self.allocations.items():
+                f.write(f"\n[{name}]\n")
+                for stat in stats:
+                    f.write(f"{stat}\n")
+        
+        if self.profiles:
+            profiles = list(self.profiles.values())
+            combined = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                combined.add(profile)
+            combined.dump_stats(os.path.join(bundle_dir, "job.pstats"))
+        
+        with open(os.path.join(bundle_dir, "phases.json"), 'w') as f:
+            json.dump(self.phases, f, indent=4)
+            
+        return bundle_dir
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+def profile_phase(profiler, name):
+    """Return the profiler's context for a phase, or a no-op when profiling is off."""
+    return profiler.phase(name) if profiler else nullcontext()
+
 # ==========================================
 # Worker Thread for Sending Emails
 # ==========================================
@@ -20,7 +157,8 @@ class MailSenderThread(QThread):
     finished = pyqtSignal(bool, str)
 
     def __init__(self, data_df, template_html, subject_template, mapping, cc_col, bcc_col, 
-                 email_col, send_as_draft, start_row, end_row):
+                 email_col, send_as_draft, start_row, end_row, profiler=None,
+                 dedup=False, dedup_cap=500):
         super().__init__()
         self.data_df = data_df
         self.template_html = template_html
@@ -32,29 +170,47 @@ class MailSenderThread(QThread):
         self.send_as_draft = send_as_draft
         self.start_row = start_row
         self.end_row = end_row
+        self.profiler = profiler
+        self.dedup = dedup
+        self.dedup_cap = max(1, dedup_cap)
 
-    def run(self):
+    def _write_profile(self):
+        if not self.profiler:
+            return ""
         try:
-            pythoncom.CoInitialize()
-            outlook = win32.Dispatch('outlook.application')
-            
-            total_records = self.end_row - self.start_row
-            success_count = 0
-            failed_records = []
+            return f"\nProfile bundle saved to: {self.profiler.write_bundle()}"
+        except Exception as e:
+            return f"\nFailed to write profile bundle: {str(e)}"
+
+    def _render(self, row):
+        subject = self.subject_template
+        body_html = self.template_html
+        
+        for placeholder, col_name in self.mapping.items():
+            val = str(row[col_name]) if pd.notna(row[col_name]) else ""
+            subject = subject.replace(f"{{{{{placeholder}}}}}", val)
+            body_html = body_html.replace(f"{{{{{placeholder}}}}}", val)
+        return subject, body_html
+
+    def _deliver(self, mail):
+        if self.send_as_draft:
+            mail.Save()
+        else:
+            mail.Send()
+
+    def _send_per_row(self, outlook, total_records):
+        success_count = 0
+        failed_records = []
+        
+        for index in range(self.start_row, self.end_row):
+            row = self.data_df.iloc[index]
+            recipient_email = str(row[self.email_col]) if self.email_col and pd.notna(row[self.email_col]) else "Unknown/Empty"
             
-            for index in range(self.start_row, self.end_row):
-                row = self.data_df.iloc[index]
-                recipient_email = str(row[self.email_col]) if self.email_col and pd.notna(row[self.email_col]) else "Unknown/Empty"
-                
-                try:
-                    subject = self.subject_template
-                    body_html = self.template_html
-                    
-                    for placeholder, col_name in self.mapping.items():
-                        val = str(row[col_name]) if pd.notna(row[col_name]) else ""
-                        subject = subject.replace(f"{{{{{placeholder}}}}}", val)
-                        body_html = body_html.replace(f"{{{{{placeholder}}}}}", val)
+            try:
+                with profile_phase(self.profiler, "render"):
+                    subject, body_html = self._render(row)
 
+                with profile_phase(self.profiler, "transport"):
                     mail = outlook.CreateItem(0)
                     mail.To = recipient_email
                     
@@ -65,34 +221,143 @@ class MailSenderThread(QThread):
                         
                     mail.Subject = subject
                     mail.HTMLBody = body_html 
+                    self._deliver(mail)
                     
-                    if self.send_as_draft:
-                        mail.Save()
-                    else:
-                        mail.Send()
+                success_count += 1
+                status_msg = f"Processed {index - self.start_row + 1}/{total_records}: {recipient_email}"
+                
+            except Exception as e:
+                error_msg = str(e)
+                failed_records.append((index + 1, recipient_email, error_msg))
+                status_msg = f"FAILED {index - self.start_row + 1}/{total_records}: {recipient_email}"
+            
+            progress_pct = int(((index - self.start_row + 1) / total_records) * 100)
+            self.progress_update.emit(progress_pct, status_msg)
+            
+        return success_count, failed_records, success_count
+
+    def _split_addresses(self, value):
+        return [addr.strip() for addr in re.split(r'[;,]', str(value)) if addr.strip()]
+
+    def _batch_by_cap(self, rows, seen):
+        """Pack the grouped rows' addresses into batches of at most dedup_cap addresses.
+        
+        `seen` is shared across the whole group and maps each address (lower-cased)
+        to the batch it went into, so every recipient gets exactly one copy. A row's
+        addresses may therefore be spread over several batches.
+        """
+        batches = [[]]
+        for index, email, addresses in rows:
+            for addr in addresses:
+                if addr.lower() not in seen:
+                    if len(batches[-1]) >= self.dedup_cap:
+                        batches.append([])
+                    batches[-1].append(addr)
+                    seen[addr.lower()] = len(batches) - 1
+        return batches
+
+    def _send_deduplicated(self, outlook, total_records):
+        """Send rows that render to the same subject and body as shared BCC messages.
+        
+        Every To/CC/BCC address of a row goes into the BCC of the shared message,
+        so recipients never see each other. Status is still tracked per row.
+        """
+        success_count = 0
+        failed_records = []
+        groups = {}
+        
+        for index in range(self.start_row, self.end_row):
+            row = self.data_df.iloc[index]
+            recipient_email = str(row[self.email_col]) if self.email_col and pd.notna(row[self.email_col]) else "Unknown/Empty"
+            
+            try:
+                addresses = self._split_addresses(recipient_email) if recipient_email != "Unknown/Empty" else []
+                if not addresses:
+                    raise ValueError("No email address")
+                for col in (self.cc_col, self.bcc_col):
+                    if col and pd.notna(row[col]):
+                        addresses.extend(self._split_addresses(row[col]))
                         
-                    success_count += 1
-                    status_msg = f"Processed {index - self.start_row + 1}/{total_records}: {recipient_email}"
+                with profile_phase(self.profiler, "render"):
+                    subject, body_html = self._render(row)
+                    key = hashlib.sha256(f"{subject}\0{body_html}".encode("utf-8")).hexdigest()
+                group = groups.setdefault(key, {"subject": subject, "body_html": body_html, "rows": []})
+                group["rows"].append((index, recipient_email, addresses))
+                status_msg = f"Rendering {index - self.start_row + 1}/{total_records}: {recipient_email}"
+                
+            except Exception as e:
+                failed_records.append((index + 1, recipient_email, str(e)))
+                status_msg = f"FAILED {index - self.start_row + 1}/{total_records}: {recipient_email}"
+                
+            # Rendering fills the first half of the progress bar, sending the second
+            progress_pct = int(((index - self.start_row + 1) / total_records) * 50)
+            self.progress_update.emit(progress_pct, status_msg)
+            
+        processed = len(failed_records)
+        messages_sent = 0
+        for group in groups.values():
+            seen = {}
+            batches = self._batch_by_cap(group["rows"], seen)
+            row_batches = {index: {seen[addr.lower()] for addr in addresses} for index, email, addresses in group["rows"]}
+            # A row is done once the last batch holding any of its addresses has gone out
+            done_after = Counter(max(batch_ids) for batch_ids in row_batches.values())
+            batch_errors = {}
+            
+            for i, batch in enumerate(batches):
+                try:
+                    with profile_phase(self.profiler, "transport"):
+                        mail = outlook.CreateItem(0)
+                        mail.BCC = "; ".join(batch)
+                        mail.Subject = group["subject"]
+                        mail.HTMLBody = group["body_html"]
+                        self._deliver(mail)
+                        
+                    messages_sent += 1
+                    status_msg = f"Sent email to {len(batch)} recipients"
                     
                 except Exception as e:
-                    error_msg = str(e)
-                    failed_records.append((index + 1, recipient_email, error_msg))
-                    status_msg = f"FAILED {index - self.start_row + 1}/{total_records}: {recipient_email}"
+                    batch_errors[i] = str(e)
+                    status_msg = f"FAILED email to {len(batch)} recipients"
+                    
+                processed += done_after[i]
+                progress_pct = 50 + int((processed / total_records) * 50)
+                self.progress_update.emit(progress_pct, f"{status_msg} ({processed}/{total_records} rows done)")
                 
-                progress_pct = int(((index - self.start_row + 1) / total_records) * 100)
-                self.progress_update.emit(progress_pct, status_msg)
+            for index, email, addresses in group["rows"]:
+                errors = [batch_errors[i] for i in sorted(row_batches[index]) if i in batch_errors]
+                if errors:
+                    failed_records.append((index + 1, email, errors[0]))
+                else:
+                    success_count += 1
+                    
+        failed_records.sort()
+        return success_count, failed_records, messages_sent
+
+    def run(self):
+        try:
+            pythoncom.CoInitialize()
+            with profile_phase(self.profiler, "transport"):
+                outlook = win32.Dispatch('outlook.application')
+            
+            total_records = self.end_row - self.start_row
+            if self.dedup:
+                success_count, failed_records, messages_sent = self._send_deduplicated(outlook, total_records)
+            else:
+                success_count, failed_records, messages_sent = self._send_per_row(outlook, total_records)
                 
+            dedup_msg = f"\nIdentical emails were combined into {messages_sent} messages." if self.dedup else ""
+            profile_msg = self._write_profile()
             if not failed_records:
-                final_msg = f"Successfully processed all {success_count} emails!"
+                final_msg = f"Successfully processed all {success_count} emails!{dedup_msg}{profile_msg}"
                 self.finished.emit(True, final_msg)
             else:
-                final_msg = f"Processed {success_count} successfully, but {len(failed_records)} failed.\n\nFailures:\n"
+                final_msg = f"Processed {success_count} successfully, but {len(failed_records)} failed.{dedup_msg}{profile_msg}\n\nFailures:\n"
                 for r_idx, email, err in failed_records:
                     final_msg += f"- Row {r_idx} ({email}): {err}\n"
                 self.finished.emit(False, final_msg)
             
         except Exception as e:
-            self.finished.emit(False, f"FATAL ERROR:\n{str(e)}")
+            self.finished.emit(False, f"FATAL ERROR:\n{str(e)}{self._write_profile()}")
             
         finally:
             pythoncom.CoUninitialize()
@@ -146,8 +411,16 @@ class HelpDialog(QDialog):
         <ul>
             <li>Select your row range (default is all rows).</li>
             <li>Leave <strong>Save as Drafts</strong> checked to push the emails to your Outlook Drafts folder for final review. Uncheck it only when you are ready to send live immediately.</li>
+            <li>For broadcast-style notices where many rows produce the same email, tick <strong>Combine identical emails</strong>. Rows with identical subject and body are sent as one email with all their addresses in BCC, up to the <strong>Max Recipients per Email</strong> limit. Each row is still reported individually.</li>
             <li>Click <strong>Process Emails</strong> and wait for the success dialogue.</li>
         </ul>
+
+        <h3>Troubleshooting: Profiling Mode</h3>
+        <ul>
+            <li>If a large merge is slow or uses a lot of memory, tick <strong>Profiling Mode</strong> and choose a folder for the results.</li>
+            <li>Click <strong>Refresh Preview</strong> so file loading is measured too, then click <strong>Process Emails</strong>.</li>
+            <li>A <code>profile_YYYYMMDD_HHMMSS_ffffff</code> folder is created per run containing <code>job.pstats</code> (CPU profile), <code>allocations.txt</code> (top allocation sites) and <code>phases.json</code> (time and peak memory per phase). Attach it when reporting a performance problem.</li>
+        </ul>
         
         <p>https://github.com/likhitanuraag</p>
         """
@@ -222,6 +495,8 @@ class MailMergeApp(QMainWindow):
         self.template_html = ""
         self.placeholders = []
         self.mapping = {}
+        self.profiler = None
+        self.profile_dir = ""
         
         self.init_ui()
         self.create_menu()
@@ -316,17 +591,17 @@ class MailMergeApp(QMainWindow):
         file_layout = QVBoxLayout()
         
         self.lbl_word = QLabel("Word Doc: Not selected")
-        btn_word = QPushButton("Browse Word Document")
-        btn_word.clicked.connect(self.prompt_load_word)
+        self.btn_word = QPushButton("Browse Word Document")
+        self.btn_word.clicked.connect(self.prompt_load_word)
         
         self.lbl_excel = QLabel("Excel File: Not selected")
-        btn_excel = QPushButton("Browse Excel Data")
-        btn_excel.clicked.connect(self.prompt_load_excel)
+        self.btn_excel = QPushButton("Browse Excel Data")
+        self.btn_excel.clicked.connect(self.prompt_load_excel)
         
         file_layout.addWidget(self.lbl_word)
-        file_layout.addWidget(btn_word)
+        file_layout.addWidget(self.btn_word)
         file_layout.addWidget(self.lbl_excel)
-        file_layout.addWidget(btn_excel)
+        file_layout.addWidget(self.btn_excel)
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
         
@@ -415,6 +690,12 @@ class MailMergeApp(QMainWindow):
         self.chk_draft.setChecked(True)
         opts_layout.addWidget(self.chk_draft)
         
+        self.chk_profile = QCheckBox("Profiling Mode")
+        self.chk_profile.setToolTip("Record CPU and memory usage per phase and save a profile bundle after each run.\n"
+                                    "Enable before loading files (or click Refresh Preview) to include load times.")
+        self.chk_profile.toggled.connect(self.toggle_profiling)
+        opts_layout.addWidget(self.chk_profile)
+        
         opts_layout.addWidget(QLabel("Start Row:"))
         self.spin_start = QSpinBox()
         self.spin_start.setMinimum(1)
@@ -427,6 +708,21 @@ class MailMergeApp(QMainWindow):
         
         send_layout.addLayout(opts_layout)
         
+        dedup_layout = QHBoxLayout()
+        self.chk_dedup = QCheckBox("Combine identical emails into one (recipients in BCC)")
+        self.chk_dedup.setToolTip("Rows whose subject and body render identically are sent as a single email.\n"
+                                  "All To/CC/BCC addresses of those rows are placed in BCC.")
+        dedup_layout.addWidget(self.chk_dedup)
+        
+        dedup_layout.addWidget(QLabel("Max Recipients per Email:"))
+        self.spin_dedup_cap = QSpinBox()
+        self.spin_dedup_cap.setRange(1, 5000)
+        self.spin_dedup_cap.setValue(500)
+        self.spin_dedup_cap.setEnabled(False)
+        self.chk_dedup.toggled.connect(self.spin_dedup_cap.setEnabled)
+        dedup_layout.addWidget(self.spin_dedup_cap)
+        send_layout.addLayout(dedup_layout)
+        
         self.btn_send = QPushButton("Process Emails")
         self.btn_send.clicked.connect(self.process_emails)
         self.btn_send.setStyleSheet("background-color: #4CAF50; color: white; font-weight: bold; padding: 10px;")
@@ -444,6 +740,25 @@ class MailMergeApp(QMainWindow):
         
         self.current_preview_index = 0
 
+    # --- Profiling ---
+    def toggle_profiling(self, enabled):
+        if enabled:
+            folder = QFileDialog.getExistingDirectory(self, "Select Folder to Save Profile Bundles")
+            if not folder:
+                self.chk_profile.setChecked(False)
+                return
+            self.enable_profiling(folder)
+        elif self.profiler:
+            self.profiler.stop()
+            self.profiler = None
+
+    def enable_profiling(self, folder):
+        self.profile_dir = folder
+        self.profiler = JobProfiler(folder)
+        self.chk_profile.blockSignals(True)
+        self.chk_profile.setChecked(True)
+        self.chk_profile.blockSignals(False)
+
     # --- Core Loading Functions ---
     def prompt_load_word(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select Word Document", "", "Word Files (*.docx)")
@@ -452,22 +767,8 @@ class MailMergeApp(QMainWindow):
 
     def _process_word(self, path):
         try:
-            with open(path, "rb") as docx_file:
-                raw_text = mammoth.extract_raw_text(docx_file).value
-                self.placeholders = list(set(re.findall(r'\{\{(.*?)\}\}', raw_text)))
-                
-                docx_file.seek(0)
-                result = mammoth.convert_to_html(docx_file)
-                
-                # INJECT CSS FOR TABLE STYLING
-                table_css = """
-                <style>
-                    table { border-collapse: collapse; width: 100%; margin-bottom: 20px; }
-                    th, td { border: 1px solid #999999; padding: 8px; text-align: left; }
-                    th { background-color: #f2f2f2; }
-                </style>
-                """
-                self.template_html = table_css + result.value
+            with profile_phase(self.profiler, "process_word"):
+                self.template_html, self.placeholders = load_word_template(path)
                 
             self.word_path = path
             self.lbl_word.setText(f"Word Doc: {path.split('/')[-1]}")
@@ -482,7 +783,8 @@ class MailMergeApp(QMainWindow):
 
     def _process_excel(self, path):
         try:
-            self.df = pd.read_excel(path)
+            with profile_phase(self.profiler, "read_excel"):
+                self.df = load_excel_data(path)
             columns = self.df.columns.tolist()
             
             for combo in [self.combo_to, self.combo_cc, self.combo_bcc]:
@@ -629,7 +931,7 @@ class MailMergeApp(QMainWindow):
             QMessageBox.warning(self, "Error", "Please select an Email column for the 'To' field.")
             return
             
-        self.btn_send.setEnabled(False)
+        self.set_running(True)
         self.progress_bar.setValue(0)
         
         self.thread = MailSenderThread(
@@ -642,7 +944,10 @@ class MailMergeApp(QMainWindow):
             email_col=self.combo_to.currentText(),
             send_as_draft=self.chk_draft.isChecked(),
             start_row=self.spin_start.value() - 1,
-            end_row=self.spin_end.value()
+            end_row=self.spin_end.value(),
+            profiler=self.profiler,
+            dedup=self.chk_dedup.isChecked(),
+            dedup_cap=self.spin_dedup_cap.value()
         )
         
         self.thread.progress_update.connect(self.update_progress)
@@ -653,8 +958,18 @@ class MailMergeApp(QMainWindow):
         self.progress_bar.setValue(val)
         self.lbl_status.setText(f"Status: {msg}")
 
+    def set_running(self, running):
+        # Loading files or toggling profiling would touch the JobProfiler the worker is using
+        for widget in [self.btn_send, self.btn_word, self.btn_excel, self.btn_refresh, self.chk_profile]:
+            widget.setEnabled(not running)
+
     def thread_finished(self, completely_successful, msg):
-        self.btn_send.setEnabled(True)
+        self.set_running(False)
+        
+        if self.profiler:
+            # Start a fresh profiler so each run gets its own bundle
+            self.profiler.stop()
+            self.profiler = JobProfiler(self.profile_dir)
         
         box = QMessageBox(self)
         if completely_successful:
@@ -680,8 +995,128 @@ class MailMergeApp(QMainWindow):
                     
         box.exec_()
 
+# ==========================================
+# Headless Entry Point
+# ==========================================
+def run_headless(args):
+    try:
+        with open(args.config, 'r') as f:
+            config_data = json.load(f)
+        if not isinstance(config_data, dict):
+            raise ValueError("the file is not a saved configuration")
+    except Exception as e:
+        print(f"Error: could not load config:\n{str(e)}")
+        return 1
+        
+    def column(key):
+        val = config_data.get(key, "-- None --")
+        return val if val != "-- None --" else None
+        
+    if not column("to"):
+        print("Error: the config does not select an Email column for the 'To' field.")
+        return 1
+        
+    profiler = JobProfiler(args.profile) if args.profile else None
+    
+    try:
+        with profile_phase(profiler, "process_word"):
+            template_html, _ = load_word_template(args.word)
+    except Exception as e:
+        print(f"Error: could not read Word document:\n{str(e)}")
+        if profiler:
+            profiler.stop()
+        return 1
+        
+    try:
+        with profile_phase(profiler, "read_excel"):
+            df = load_excel_data(args.excel)
+    except Exception as e:
+        print(f"Error: could not read Excel file:\n{str(e)}")
+        if profiler:
+            profiler.stop()
+        return 1
+        
+    # Fail before anything is sent; the GUI guarantees these via its widgets
+    end_row = args.end if args.end else len(df)
+    errors = []
+    if not 1 <= args.start <= end_row <= len(df):
+        errors.append(f"Row range {args.start}-{end_row} is invalid; the sheet has {len(df)} rows.")
+    columns = [column(key) for key in ("to", "cc", "bcc")] + list(config_data.get("mapping", {}).values())
+    for col in dict.fromkeys(columns):
+        if col and col not in df.columns:
+            errors.append(f"Column '{col}' from the config is not in the Excel file.")
+    if errors:
+        print("Error:\n" + "\n".join(errors))
+        if profiler:
+            profiler.stop()
+        return 1
+        
+    thread = MailSenderThread(
+        data_df=df,
+        template_html=template_html,
+        subject_template=config_data.get("subject", ""),
+        mapping=config_data.get("mapping", {}),
+        cc_col=column("cc"),
+        bcc_col=column("bcc"),
+        email_col=column("to"),
+        send_as_draft=not args.send,
+        start_row=args.start - 1,
+        end_row=end_row,
+        profiler=profiler,
+        dedup=args.dedup,
+        dedup_cap=args.dedup_cap
+    )
+    
+    result = {}
+    def on_finished(ok, msg):
+        result["ok"] = ok
+        print(msg)
+        
+    thread.progress_update.connect(lambda val, msg: print(f"[{val:3d}%] {msg}"))
+    thread.finished.connect(on_finished)
+    # Run in the calling thread; no event loop is needed without a GUI
+    thread.run()
+    
+    if profiler:
+        profiler.stop()
+    return 0 if result.get("ok") else 1
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Mail Merge Utility. Starts the GUI unless --headless is given.")
+    parser.add_argument("--headless", action="store_true", help="Run a merge without the GUI")
+    parser.add_argument("--word", help="Word template (.docx)")
+    parser.add_argument("--excel", help="Excel data (.xlsx)")
+    parser.add_argument("--config", help="Configuration saved from the GUI (.json)")
+    parser.add_argument("--start", type=int, default=1, help="First row to process (default: 1)")
+    parser.add_argument("--end", type=int, default=0, help="Last row to process (default: all rows)")
+    parser.add_argument("--send", action="store_true", help="Send immediately instead of saving as drafts")
+    parser.add_argument("--dedup", action="store_true", help="Combine identical emails into one, with recipients in BCC")
+    parser.add_argument("--dedup-cap", type=int, default=500, help="Max recipients per combined email (default: 500)")
+    parser.add_argument("--profile", metavar="DIR", help="Enable profiling mode and save profile bundles in DIR (GUI or headless)")
+    # Unknown options are passed through to Qt in GUI mode only
+    args, unknown = parser.parse_known_args(argv)
+    
+    if args.headless:
+        if unknown:
+            parser.error(f"unrecognized arguments: {' '.join(unknown)}")
+        if not (args.word and args.excel and args.config):
+            parser.error("--headless requires --word, --excel and --config")
+    else:
+        headless_only = ["word", "excel", "config", "start", "end", "send", "dedup", "dedup_cap"]
+        used = [name for name in headless_only if getattr(args, name) != parser.get_default(name)]
+        if used:
+            options = ", ".join("--" + name.replace("_", "-") for name in used)
+            parser.error(f"{options} can only be used with --headless")
+    return args
+
 if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    if args.headless:
+        sys.exit(run_headless(args))
+        
     app = QApplication(sys.argv)
     window = MailMergeApp()
+    if args.profile:
+        window.enable_profiling(args.profile)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file